@@ -78,6 +78,11 @@ code?
 
 """
 
+import os
+import re
+from itertools import islice
+from multiprocessing import Pool
+
 # keypad for part 1
 # the spaces are indicators for the frontier of keypad
 keypad = ["     ",
@@ -99,41 +104,172 @@ keypad2 = ["       ",
 # each moves has a direction (dx,dy)
 moves = {'U': (0, -1), 'D': (0, 1), 'R': (1, 0), 'L': (-1, 0)}
 
+# a run of identical moves
+run = re.compile(r"U+|D+|R+|L+")
+
+# input size (bytes) from which the instructions are processed in parallel
+parallel_size = 1 << 24
+
 
 def read_input():
     """ This function read the instruction from the input file and
-    return a clean list of instruction. Each elements of the returned
-    list is one of U,D,L,R i.e. a direction hor or vert on the plane."""
-
-    f = open('input', 'r')
-    string = f.read()
-
-    lstring = string.split("\n")
-    # we remove the last void instruction
-    # this could be made in a safer way
-    lstring = lstring[:-1]
-
-    return(lstring)
-
-
-def process(x, y, keyp):
-    """Process the instructions starting from the position x,y. On the
-    keypad keyp."""
-    point = []
-    for scan in read_input():
-        for c in scan:
-            # for each instruction char get dx, dy
-            dx, dy = moves[c]
-            # accept moves if it is not on the forntier (space char)
-            if keyp[y + dy][x + dx] != " ":
-                x += dx
-                y += dy
-        # memorize new position char
-        point.append(keyp[y][x])
-    # return final string of char of the walk
-    return (''.join(point))
-
-# walk on keypad starting from position 2,2 i.e. char 5
-print("Day 2. Solution of part 1: {}".format(process(2, 2, keypad)))
-# walk on keypad2 starting from position 1,3 i.e. char 5
-print("Day 2. Solution of part 2: {}".format(process(1, 3, keypad2)))
+    generate them one line at a time, without reading the whole file.
+    Each char of a line is one of U,D,L,R i.e. a direction hor or vert on the
+    plane."""
+
+    with open('input', 'r') as f:
+        for line in f:
+            yield line.strip()
+
+
+def compile_keypad(keyp):
+    """Compile the keypad keyp in a transition table (key, run) -> key, where
+    run is a run of identical moves. Return the table and the longest run
+    in it: a longer run ends on the same key (the move saturates on the
+    frontier of the keypad), so it can be cut to that length."""
+
+    # from any key we can cross the whole keypad with len(keyp) - 2 moves
+    size = len(keyp) - 2
+    table = {}
+    for y, row in enumerate(keyp):
+        for x, key in enumerate(row):
+            if key == " ":
+                continue
+            for c, (dx, dy) in moves.items():
+                px, py = x, y
+                for n in range(1, size + 1):
+                    # accept moves if it is not on the frontier (space char)
+                    if keyp[py + dy][px + dx] != " ":
+                        px += dx
+                        py += dy
+                    table[key, c * n] = keyp[py][px]
+    return(table, size)
+
+
+def walk(keypads, keys, lines):
+    """Walk the instructions lines on all the compiled keypads at once,
+    starting from the key keys[i] on keypad i. Return the code of each
+    keypad."""
+    keys = list(keys)
+    codes = [[] for keyp in keypads]
+    for scan in lines:
+        runs = run.findall(scan)
+        for i, (table, size) in enumerate(keypads):
+            key = keys[i]
+            for r in runs:
+                key = table[key, r[:size]]
+            keys[i] = key
+            # memorize new position char
+            codes[i].append(key)
+    # return final string of char of the walks
+    return([''.join(code) for code in codes])
+
+
+def process(keypads, start="5", lines=None):
+    """Process the instructions (the lines of the input file, if lines is
+    None) on all the compiled keypads at once, starting from the key start on
+    each one. Return the code of each keypad."""
+    return(walk(keypads, [start] * len(keypads), read_input() if lines is None else lines))
+
+
+def line_function(scan, keypads, orders):
+    """Return, for each compiled keypad, the function mapping every key to
+    the key reached following the line scan from it. A function is a string
+    with the image of each key, in the order of the keypad keys in orders."""
+    runs = run.findall(scan)
+    functions = []
+    for (table, size), order in zip(keypads, orders):
+        image = []
+        for key in order:
+            for r in runs:
+                key = table[key, r[:size]]
+            image.append(key)
+        functions.append(''.join(image))
+    return(functions)
+
+
+def keypad_keys(table):
+    "Return the keys of a compiled keypad (in a fixed order)."
+    return(sorted({key for key, r in table}))
+
+
+def compose(f, g, keys):
+    "Return the function f followed by g (both over keys)."
+    return(''.join(g[keys.index(k)] for k in f))
+
+
+def init_worker(keypads):
+    "Make the compiled keypads available to the worker process."
+    global compiled, orders
+    compiled = keypads
+    orders = [keypad_keys(table) for table, size in keypads]
+
+
+def block_function(block):
+    """Return, for each keypad, the function of the whole block of lines:
+    the composition of the functions of its lines."""
+    total = [''.join(keys) for keys in orders]
+    for scan in block:
+        for i, f in enumerate(line_function(scan, compiled, orders)):
+            total[i] = compose(total[i], f, orders[i])
+    return(total)
+
+
+def walk_block(job):
+    """Return the codes of the lines of a block, job is the block and the
+    key at its start on each keypad."""
+    block, keys = job
+    return(walk(compiled, keys, block))
+
+
+def parallel_process(keypads, start="5", lines=None, block=10000, processes=None):
+    """Same as process, but on a pool of processes (lines, if given, must be
+    a sequence: it is read twice).
+
+    Every line is a function over the keys and the functions compose
+    associatively, so this is a blocked prefix scan in two parallel passes:
+    the pool first computes the function of each block of lines, these are
+    scanned in order to get the key at the start of each block, then the
+    pool walks each block from its start keys."""
+
+    def blocks():
+        scans = read_input() if lines is None else iter(lines)
+        while True:
+            chunk = list(islice(scans, block))
+            if not chunk:
+                return
+            yield chunk
+
+    orders = [keypad_keys(table) for table, size in keypads]
+    keys = [start] * len(keypads)
+    starts = []
+    codes = [[] for keyp in keypads]
+    with Pool(processes, init_worker, (keypads,)) as pool:
+        # the scan of the block functions gives the key at the start of
+        # each block
+        for total in pool.imap(block_function, blocks()):
+            starts.append(keys)
+            keys = [f[order.index(key)] for f, order, key in zip(total, orders, keys)]
+
+        for block_codes in pool.imap(walk_block, zip(blocks(), starts)):
+            for i, code in enumerate(block_codes):
+                codes[i].append(code)
+    return([''.join(code) for code in codes])
+
+if __name__ == "__main__":
+    keypads = [compile_keypad(keypad), compile_keypad(keypad2)]
+
+    # check with the example of the puzzle
+    example = ["ULL", "RRDDD", "LURDL", "UUUUD"]
+    assert process(keypads, lines=example) == ["1985", "5DB3"]
+
+    # walk on both keypads starting from char 5, use all the cores only
+    # when the input is large enough to pay for them
+    if os.path.getsize('input') > parallel_size:
+        # check the pool with the example, also in blocks of more lines
+        assert parallel_process(keypads, lines=example, block=3) == ["1985", "5DB3"]
+        code, code2 = parallel_process(keypads)
+    else:
+        code, code2 = process(keypads)
+    print("Day 2. Solution of part 1: {}".format(code))
+    print("Day 2. Solution of part 2: {}".format(code2))
@@ -41,41 +41,167 @@ triangles are possible?
 
 """
 
-
-def read_input():
-    "Read all rows of input file as tuple of three numbers."
-    f = open('input', 'r')
-    alltern = [line.strip().split() for line in f]
-    f.close()
-    return(alltern)
-
-
-def process(tern):
-    "Return the number of rows that can be interpreted three side of a triangle"
-    num = 0
-    for a, b, c in tern:
-        a = int(a)
-        b = int(b)
-        c = int(c)
-        if ((a + b) > c) & ((a + c) > b) & ((b + c) > a):
-            num += 1
-    return (num)
-
-
-def quasitranspose(l):
-    "Transpose the tuple of three number. And stack them again in group of three."
-    t = []
-    for i in zip(*l):
-        for k in range(0, len(i), 3):
-            t.append(list(i)[k:k + 3])
-    return(t)
-
-# list of numbers
-l = read_input()
-# list of numbers transposed
-t = quasitranspose(l)
-
-# Number of triangle by rows
-print("Day 3. Solution of part 1: {}".format(process(l)))
-# Number of triangle by columns
-print("Day 3. Solution of part 2: {}".format(process(t)))
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+# input size (bytes) from which the triangles are counted in parallel
+parallel_size = 1 << 28
+
+
+def is_triangle(a, b, c):
+    "Return True if a, b and c can be the three sides of a triangle."
+    return((a + b) > c and (a + c) > b and (b + c) > a)
+
+
+def count_stream(f, stop=None, size=1 << 20):
+    """Return the number of triangles by rows and by columns reading the
+    file object f in chunks of `size` bytes, from its current position up to
+    the offset stop (or the end of file).
+
+    Rows are counted as soon as they are read, while the last (up to) three
+    rows are kept in a buffer until they can be counted by columns: one pass,
+    constant memory."""
+    rows = columns = 0
+    buffer = []
+    rest = b''
+    while True:
+        if stop is None:
+            chunk = f.read(size)
+        else:
+            chunk = f.read(max(min(size, stop - f.tell()), 0))
+        lines = (rest + chunk).split(b'\n')
+        # the last line may continue in the next chunk
+        rest = lines.pop() if chunk else b''
+        for line in lines:
+            sides = [int(n) for n in line.split()]
+            if not sides:
+                continue
+            rows += is_triangle(*sides)
+            buffer.append(sides)
+            if len(buffer) == 3:
+                columns += sum(is_triangle(*t) for t in zip(*buffer))
+                buffer = []
+        if not chunk:
+            break
+    return(rows, columns)
+
+
+def split_file(fname, parts, size=1 << 20):
+    """Return the offsets splitting the file in about `parts` pieces, each
+    one starting after a multiple of three lines."""
+    total = os.path.getsize(fname)
+    targets = [total * i // parts for i in range(1, parts)]
+    points = [0]
+    lines = 0
+    offset = 0
+    with open(fname, 'rb') as f:
+        while targets:
+            chunk = f.read(size)
+            if not chunk:
+                break
+            pos = 0
+            while targets and targets[0] < offset + len(chunk):
+                # jump to the target, counting the lines we skip
+                skip = max(targets[0] - offset, pos)
+                lines += chunk.count(b'\n', pos, skip)
+                pos = skip
+                # then move to the end of the line closing a group of three
+                nl = chunk.find(b'\n', pos)
+                if nl < 0:
+                    break
+                lines += 1
+                pos = nl + 1
+                if lines % 3 == 0:
+                    points.append(offset + pos)
+                    targets.pop(0)
+            lines += chunk.count(b'\n', pos)
+            offset += len(chunk)
+    points.append(total)
+    points = sorted(set(points))
+    return(list(zip(points, points[1:])))
+
+
+def count_part(part):
+    "Count the triangles in the part (fname, start, stop) of a file."
+    fname, start, stop = part
+    with open(fname, 'rb') as f:
+        f.seek(start)
+        return(count_stream(f, stop))
+
+
+def parallel_count(fname='input', processes=None):
+    """Return the number of triangles by rows and by columns counting the
+    pieces of the file (split on three lines boundaries) on a pool of
+    processes."""
+    parts = split_file(fname, 4 * (processes or os.cpu_count()))
+    with Pool(processes) as pool:
+        counts = pool.map(count_part, [(fname, a, b) for a, b in parts])
+    return(sum(r for r, c in counts), sum(c for r, c in counts))
+
+
+def parse_sides(buf):
+    """Parse the numbers in the byte array buf (three numbers a row) into an
+    array of rows of three sides, without looping on the numbers."""
+    digit = (buf >= ord('0')) & (buf <= ord('9'))
+    edge = np.diff(digit.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edge == 1)
+    ends = np.flatnonzero(edge == -1)
+    if not len(starts):
+        return(np.zeros((0, 3), dtype=np.int64))
+    # each digit is worth a power of ten counted from the end of its number
+    pos = np.flatnonzero(digit)
+    last = np.repeat(ends - 1, ends - starts)
+    value = (buf[pos] - ord('0')).astype(np.int64) * 10 ** (last - pos)
+    return(np.add.reduceat(value, np.searchsorted(pos, starts)).reshape(-1, 3))
+
+
+def count_triangles(sides):
+    "Return the number of rows of sides that are the sides of a triangle."
+    # once sorted, only the two smaller sides against the larger one matter
+    s = np.sort(sides, axis=1)
+    return(int(np.count_nonzero(s[:, 0] + s[:, 1] > s[:, 2])))
+
+
+def by_columns(sides):
+    """Regroup the sides by columns: every block of three rows, transposed,
+    gives three triangles."""
+    return(sides.reshape(-1, 3, 3).transpose(0, 2, 1).reshape(-1, 3))
+
+
+def count_file(fname='input', chunk=1 << 26):
+    """Return the number of triangles by rows and by columns in the file.
+    The file is memory mapped and parsed in chunks of about `chunk` bytes,
+    cut on a boundary of three lines so that each chunk regroups by columns
+    on its own."""
+    data = np.memmap(fname, dtype=np.uint8, mode='r')
+    rows = columns = 0
+    start = 0
+    while start < len(data):
+        stop = min(start + chunk, len(data))
+        if stop < len(data):
+            newlines = np.flatnonzero(data[start:stop] == ord('\n'))
+            n = len(newlines) // 3 * 3
+            if n:
+                stop = start + int(newlines[n - 1]) + 1
+            else:
+                # the chunk is too small to hold three lines
+                stop = len(data)
+        sides = parse_sides(np.asarray(data[start:stop]))
+        rows += count_triangles(sides)
+        columns += count_triangles(by_columns(sides))
+        start = stop
+    return(rows, columns)
+
+if __name__ == "__main__":
+    # use all the cores only when the input is large enough to pay for them
+    if os.path.getsize('input') > parallel_size:
+        rows, columns = parallel_count()
+    else:
+        rows, columns = count_file()
+
+    # Number of triangle by rows
+    print("Day 3. Solution of part 1: {}".format(rows))
+    # Number of triangle by columns
+    print("Day 3. Solution of part 2: {}".format(columns))
@@ -50,11 +50,17 @@ What is the sector ID of the room where North Pole objects are stored?
 
 """
 
-import re
-from collections import Counter
+from bisect import bisect_left
+
+import numpy as np
 
 # list of letters
-alphabet = list('abcdefghijklmnopqrstuvwxyz')
+alphabet = 'abcdefghijklmnopqrstuvwxyz'
+
+# the rotation cipher depends only on room_id % 26: one translation table for
+# each shift, dashes become spaces
+shift_tables = [str.maketrans(alphabet + '-', alphabet[n:] + alphabet[:n] + ' ')
+                for n in range(len(alphabet))]
 
 
 def read_input():
@@ -67,62 +73,120 @@ def read_input():
     return(string.split("\n")[0:-1])
 
 
-def count_real_room(l):
-    """Return number of real rooms and the id of the room containing the word north."""
-    count = 0
-    roomn = -1
-    for room in l:
-        mrx = re.search(r"^(\D+)-(\d+)\[(.*)\]", room)
-
-        # get the wole name
-        room_name = mrx.group(1).split('-')
-
-        # the coded name
-        coded = mrx.group(1).replace('-', '')
-
-        # get the sorted char that compose the coded name
-        lcoded = sorted(list(coded))
-        coded = ''.join(lcoded)
-
-        # the room id
-        room_id = int(mrx.group(2))
-
-        # and the check group
-        chks = mrx.group(3)
-
-        # sort the char that compose the coded name by frequency
-        # c*1000-ord is a unique key used for sort
-        fiver = [(a, c * 1000 - ord(a)) for a, c in Counter(coded).most_common()]
-        fiver = sorted(fiver, key=lambda count: count[1], reverse=True)
-        # get only the first five
-        fiver = [a for a, c in fiver][0:5]
-        fiver = ''.join(fiver)
-
-        # if the room name is valid
-        if fiver == chks:
-            count += room_id
-            nwl = []
-            # decode room name
-            for word in room_name:
-                wl = list(word)
-                for c in wl:
-                    # for each char use decode by rotation
-                    # index = wl.index(c)
-                    nindex = alphabet.index(c)
-                    nindex = (nindex + room_id) % (len(alphabet))
-                    # and add the decoded char to the new list
-                    nwl.append(alphabet[nindex])
-                nwl.append(' ')
-            nwl = ''.join(nwl)
-
-            # if the decoded name contains north
-            # we have found the room where
-            # "North Pole objects are stored"
-            if 'north' in nwl:
-                roomn = room_id
-    return(count, roomn)
-
-l = read_input()
-
-print("Day 4. Solution of part 1: {}".format(count_real_room(l)[0]))
-print("Day 4. Solution of part 2: {}".format(count_real_room(l)[1]))
+def decrypt(name, room_id):
+    "Decrypt the room name (words joined by dashes) of the room room_id."
+    return(name.translate(shift_tables[room_id % 26]))
+
+
+class RoomIndex:
+    """Inverted index of the decrypted names of the rooms: each word points
+    to the ids of the rooms whose name contains it. The words are also kept
+    sorted to answer prefix queries."""
+
+    def __init__(self):
+        self.rooms = {}
+        self.words = None
+
+    def add(self, name, room_id):
+        "Add the encrypted name of the room room_id to the index."
+        for word in decrypt(name, room_id).split():
+            self.rooms.setdefault(word, []).append(room_id)
+        # the sorted words must be computed again
+        self.words = None
+
+    def search(self, word):
+        "Return the ids of the rooms whose name contains word."
+        return(list(self.rooms.get(word, [])))
+
+    def prefix(self, prefix):
+        "Return the ids of the rooms whose name contains a word starting with prefix."
+        if self.words is None:
+            self.words = sorted(self.rooms)
+        found = []
+        # the words starting with prefix follow its insertion point
+        i = bisect_left(self.words, prefix)
+        while i < len(self.words) and self.words[i].startswith(prefix):
+            found.extend(self.rooms[self.words[i]])
+            i += 1
+        return(sorted(set(found)))
+
+
+def validate_block(data):
+    """Return the ids of the rooms in data (the bytes of whole rows) and
+    whether each room is real, checking all the checksums at once with
+    array operations.
+
+    The letters of the names become an N x 26 matrix of counts, and a
+    stable sort of each row by decreasing count keeps ties in alphabetical
+    order, so its first five columns are the expected checksum of every
+    room."""
+
+    # one `[` and one `]` for each room
+    left = np.flatnonzero(data == ord('['))
+    right = np.flatnonzero(data == ord(']'))
+
+    # the checksum is made by the five chars after `[`
+    checksum = data[left[:, None] + np.arange(1, 6)].astype(np.int64) - ord('a')
+
+    # the room id is the only number in each row
+    digit = (data >= ord('0')) & (data <= ord('9'))
+    edge = np.diff(digit.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edge == 1)
+    ends = np.flatnonzero(edge == -1)
+    pos = np.flatnonzero(digit)
+    last = np.repeat(ends - 1, ends - starts)
+    value = (data[pos] - ord('0')).astype(np.int64) * 10 ** (last - pos)
+    ids = np.add.reduceat(value, np.searchsorted(pos, starts))
+
+    # a letter belongs to the name of room n if n `[` are before it and as
+    # many `]` (otherwise it is in the checksum)
+    pos = np.flatnonzero((data >= ord('a')) & (data <= ord('z')))
+    room = np.searchsorted(left, pos)
+    name = room == np.searchsorted(right, pos)
+    letter = data[pos[name]].astype(np.int64) - ord('a')
+    counts = np.bincount(room[name] * 26 + letter, minlength=len(left) * 26)
+    counts = counts.reshape(len(left), 26)
+
+    # letters by decreasing count, ties in alphabetical order
+    order = np.argsort(-counts, axis=1, kind='stable')[:, :5]
+    top = np.take_along_axis(counts, order, axis=1)
+    real = (order == checksum).all(axis=1) & (top > 0).all(axis=1)
+    return(ids, real)
+
+
+def validate_rooms(fname='input', chunk=1 << 24):
+    """Return the ids of all the rooms in the file and whether each room is
+    real. The file is memory mapped and validated in chunks of about
+    `chunk` bytes cut on a newline, so the temporary arrays stay bounded
+    whatever the number of rooms."""
+    data = np.memmap(fname, dtype=np.uint8, mode='r')
+    ids = []
+    real = []
+    start = 0
+    while start < len(data):
+        stop = min(start + chunk, len(data))
+        if stop < len(data):
+            newlines = np.flatnonzero(data[start:stop] == ord('\n'))
+            if len(newlines):
+                stop = start + int(newlines[-1]) + 1
+            else:
+                # the chunk is too small to hold a whole row
+                stop = len(data)
+        block_ids, block_real = validate_block(np.asarray(data[start:stop]))
+        ids.append(block_ids)
+        real.append(block_real)
+        start = stop
+    return(np.concatenate(ids), np.concatenate(real))
+
+ids, real = validate_rooms()
+
+# index the names of the real rooms
+index = RoomIndex()
+for room, room_id, ok in zip(read_input(), ids.tolist(), real.tolist()):
+    if ok:
+        index.add(room[:room.rindex('-')], room_id)
+
+print("Day 4. Solution of part 1: {}".format(ids[real].sum()))
+# the room where "North Pole objects are stored" (-1 if there is none)
+roomn = index.prefix('north')
+print("Day 4. Solution of part 2: {}".format(roomn[0] if roomn else -1))
@@ -69,51 +69,150 @@ Your puzzle input is still ojvtpuvg.
 
 
 import hashlib
+import os
+from collections import deque
+from multiprocessing import Pool
 
 ststring = "ojvtpuvg"
 
-
-def md5_input(s):
-    "MD5 of string s, hex lowercase output."
-    return(hashlib.md5(s.encode('utf-8')).hexdigest())
-
-
-def get_password(s):
-    "Return password as requested by part 1 method."
-    finished = 0
-    index = 0
+# directory of the files with the interesting hashes already mined
+hits_dir = "hits"
+
+
+# an MD5 digest starting with five hex zeros (20 zero bits) is smaller than
+# this one
+interesting = b'\x00\x00\x10'
+
+
+def mine_block(args):
+    """Return the (index, md5) of the interesting hashes (five leading
+    zeros) of s + index for index in [start, stop).
+
+    The salt s is hashed once: each index copies that prefix state and
+    appends only its own digits, and the raw digest is checked before
+    building the hex one."""
+    s, start, stop = args
+    prefix = hashlib.md5(s.encode('utf-8'))
+    hits = []
+    for index in range(start, stop):
+        md5 = prefix.copy()
+        md5.update(b'%d' % index)
+        if md5.digest() < interesting:
+            hits.append((index, md5.hexdigest()))
+    return(hits)
+
+
+def mine_blocks(s, start=0, block=1 << 15, processes=None):
+    """Generate, for each block of indexes from start onward, the end of the
+    block and the (index, md5) of its interesting hashes of s.
+
+    The blocks are mined by a pool of processes. A window of a few blocks
+    per process is kept in flight and the blocks are consumed in order, so
+    the hits come out exactly in the sequential order. The pool is stopped
+    as soon as the caller stops asking for blocks."""
+    with Pool(processes) as pool:
+        pending = deque()
+        for i in range(4 * (processes or os.cpu_count())):
+            pending.append((start + block, pool.apply_async(mine_block, ((s, start, start + block),))))
+            start += block
+        while True:
+            stop, hits = pending.popleft()
+            pending.append((start + block, pool.apply_async(mine_block, ((s, start, start + block),))))
+            start += block
+            yield stop, hits.get()
+
+
+def hits_path(s):
+    "Return the path of the file storing the interesting hashes of s."
+    return(os.path.join(hits_dir, hashlib.md5(s.encode('utf-8')).hexdigest()))
+
+
+def load_hits(path):
+    """Return the interesting hashes stored in the file path and the index
+    up to which they were mined (0 if there is no such file).
+
+    The file is a log of lines `index md5` for the hits and `index` for the
+    checkpoints. Whatever follows the last checkpoint (hits of a block not
+    completed, or a line left incomplete by a crash) is cut away, so the
+    next append starts right after it and no hit is stored twice."""
+    if not os.path.exists(path):
+        return([], 0)
+    hits = []
+    block = []
+    scanned = 0
+    end = 0
+    offset = 0
+    with open(path, 'rb+') as f:
+        data = f.read()
+        # the last piece has no newline: it is incomplete (or empty)
+        for line in data.split(b'\n')[:-1]:
+            offset += len(line) + 1
+            line = line.split()
+            if len(line) == 2:
+                block.append((int(line[0]), line[1].decode('ascii')))
+            elif len(line) == 1:
+                scanned = int(line[0])
+                hits.extend(block)
+                block = []
+                end = offset
+        if end < len(data):
+            f.truncate(end)
+    return(hits, scanned)
+
+
+def cached_mine(s):
+    """Generate the (index, md5) of the interesting hashes of s, in index
+    order, keeping them on disk.
+
+    The hits already stored for s are replayed first, then mining resumes
+    from the last checkpoint. Each mined block is appended to the file (its
+    hits, then its end as the new checkpoint) and synced before its hits are
+    generated, so an interrupted run keeps its progress."""
+    path = hits_path(s)
+    hits, scanned = load_hits(path)
+    for hit in hits:
+        yield hit
+
+    os.makedirs(hits_dir, exist_ok=True)
+    with open(path, 'a') as f:
+        for stop, hits in mine_blocks(s, scanned):
+            for index, md5 in hits:
+                f.write("{} {}\n".format(index, md5))
+            f.write("{}\n".format(stop))
+            f.flush()
+            os.fsync(f.fileno())
+            for hit in hits:
+                yield hit
+
+
+def get_passwords(hits):
+    """Return the passwords as requested by part 1 and part 2 methods, built
+    together from the same stream of interesting hashes (index, md5)."""
     password = []
-    while finished < 8:
-        md5 = md5_input(s + str(index))
-        if md5[0:5] == "00000":
-            password.append(md5[5])
-            finished += 1
-        index += 1
-
-    return "".join(password)
-
-
-def get_password2(s):
-    "Return password as requested by part 2 method."
-    finished = 0
-    index = 0
-    password = list('_' * 8)
+    password2 = list('_' * 8)
     verstring = list('01234567')
-    while finished < 8:
-        md5 = md5_input(s + str(index))
-        if md5[0:5] == "00000":
-            position = md5[5]
-
-            if position in verstring:
-                password[int(position)] = md5[6]
-                verstring.remove(position)
-                finished += 1
-
-        index += 1
-
-    return "".join(password)
+    for index, md5 in hits:
+        # part 1 method: the sixth char, in order
+        if len(password) < 8:
+            password.append(md5[5])
 
-# Password from hashing of input method 1
-print("Day 5. Solution of part 1: {}".format(get_password(ststring)))
-# Password from hashing of input method 2
-print("Day 5. Solution of part 2: {}".format(get_password2(ststring)))
+        # part 2 method: the sixth char is the position of the seventh
+        position = md5[5]
+        if position in verstring:
+            password2[int(position)] = md5[6]
+            verstring.remove(position)
+
+        # stop mining when both are complete
+        if len(password) == 8 and not verstring:
+            break
+
+    return "".join(password), "".join(password2)
+
+if __name__ == "__main__":
+    # Passwords from a single mining pass of the hashes of input (resumed
+    # from the hashes mined by the previous runs)
+    password, password2 = get_passwords(cached_mine(ststring))
+    # Password from hashing of input method 1
+    print("Day 5. Solution of part 1: {}".format(password))
+    # Password from hashing of input method 2
+    print("Day 5. Solution of part 2: {}".format(password2))
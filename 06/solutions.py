@@ -60,32 +60,99 @@ is the original message that Santa is trying to send?
 
 """
 
-from collections import Counter
-
-
-def read_input():
-    "Read all rows of input file as tuple of chars."
-    f = open('input', 'r')
-    alltern = [list(line.strip()) for line in f]
-    f.close()
-    return(alltern)
-
-
-def transpose(l):
-    "Transpose the tuple of lines."
-    t = [list(i) for i in zip(*l)]
-    return(t)
-
-# list of messages
-l = read_input()
-# list of messages transposed
-t = transpose(l)
-
-cmessage = [Counter(i).most_common()[0][0] for i in t]
-lmessage = [Counter(i).most_common()[-1][0] for i in t]
-
-message = ''.join(cmessage)
+import numpy as np
+
+
+def column_counts(fname='input', chunk=1 << 20):
+    """Return the number of times each letter appears in each column of the
+    messages, as a (width, 26) array.
+
+    The file is memory mapped as a 2-D uint8 array (one row per message, the
+    line ends, `\n` or `\r\n`, are skipped by the row stride) and counted
+    with one bincount every `chunk` rows, each column with its own 26 bins.
+    All the messages must have the same length, and only lowercase letters,
+    otherwise a ValueError is raised."""
+    data = np.memmap(fname, dtype=np.uint8, mode='r')
+    # the first line end gives the length of every message
+    first = int(np.argmax(data == ord('\n')))
+    if data[first] != ord('\n'):
+        # a single message without newline
+        first = len(data)
+    eol = 2 if first and data[first - 1] == ord('\r') else 1
+    width = first + 1 - eol
+    stride = first + 1
+    # the last message may have no line end
+    n = (len(data) + eol) // stride
+    if (len(data) not in (n * stride, n * stride - eol) or
+            (data[first::stride] != ord('\n')).any() or
+            (eol == 2 and (data[first - 1::stride] != ord('\r')).any())):
+        raise ValueError("{}: the messages must all have the same length".format(fname))
+
+    rows = np.lib.stride_tricks.as_strided(data, (n, width), (stride, 1))
+    bins = 26 * np.arange(width)
+    counts = np.zeros(width * 26, dtype=np.int64)
+    for start in range(0, n, chunk):
+        block = rows[start:start + chunk].astype(np.int64) - ord('a')
+        if block.size and (block.min() < 0 or block.max() > 25):
+            raise ValueError("{}: the messages must be lowercase letters".format(fname))
+        counts += np.bincount((block + bins).ravel(), minlength=width * 26)
+    return(counts.reshape(width, 26))
+
+
+def decode(letters):
+    "Return the message made by the letters (as indexes in the alphabet)."
+    return(''.join(chr(ord('a') + i) for i in letters))
+
+
+class ColumnDecoder:
+    """Online decoder of a stream of messages: it keeps 26 counters for each
+    column, updated by every message, so the decoded messages are available
+    at any moment without looking again at the history."""
+
+    def __init__(self, width):
+        self.counts = [[0] * 26 for i in range(width)]
+
+    def add(self, message):
+        "Count the letters of a new message."
+        for column, c in zip(self.counts, message):
+            column[ord(c) - ord('a')] += 1
+
+    def merge(self, other):
+        "Add the counters of another decoder (e.g. of another shard)."
+        for column, more in zip(self.counts, other.counts):
+            for i, n in enumerate(more):
+                column[i] += n
+
+    def most_common(self):
+        "Return the message made by the most common letter of each column."
+        return(decode(column.index(max(column)) for column in self.counts))
+
+    def least_common(self):
+        """Return the message made by the least common letter of each column
+        (among the ones that appear)."""
+        letters = []
+        for column in self.counts:
+            seen = [n for n in column if n] or [0]
+            letters.append(column.index(min(seen)))
+        return(decode(letters))
+
+# check the online decoder with the example of the puzzle, split in two
+# shards merged at the end
+example = """eedadn drvtee eandsr raavrd atevrs tsrnev sdttsa rasrtv nssdts ntnada
+             svetve tesnvt vntsnd vrdear dvrsen enarar""".split()
+shards = [ColumnDecoder(6), ColumnDecoder(6)]
+for i, m in enumerate(example):
+    shards[i % 2].add(m)
+shards[0].merge(shards[1])
+assert shards[0].most_common() == "easter"
+assert shards[0].least_common() == "advent"
+
+counts = column_counts()
+
+# the most common letter of each column
+message = decode(np.argmax(counts, axis=1))
 print("Day 6. Solution of part 1: {}".format(message))
 
-message = ''.join(lmessage)
+# the least common letter of each column (among the ones that appear)
+message = decode(np.argmin(np.where(counts > 0, counts, counts.max() + 1), axis=1))
 print("Day 6. Solution of part 2: {}".format(message))
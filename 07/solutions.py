@@ -55,22 +55,23 @@ How many IPs in your puzzle input support SSL?
 
 """
 
+import os
 import re
-# (?=...) is a lookahead assertion:
-# Matches but doesn’t consume any part of the string.
-# In this way we can handle overlapping match
+import tempfile
+from multiprocessing import Pool
 
+import numpy as np
 
-def read_input():
-    "Read all rows as a list of encrypted rooms."
-    f = open('input', 'r')
-    string = f.read()
-    f.close()
-    # remove the last void one
-    # (it can be better than this)
-    return(string.split("\n")[:-1])
+# bytes with a meaning for the scanner
+newline, left, right = b'\n[]'
 
+# input size (bytes) from which the addresses are scanned in parallel
+parallel_size = 1 << 26
 
+
+# (?=...) is a lookahead assertion:
+# Matches but doesn’t consume any part of the string.
+# In this way we can handle overlapping match
 def count_abba(l):
     "Return number of ABBA ip."
     count = 0
@@ -104,6 +105,18 @@ def count_abba(l):
     return(count)
 
 
+def aba_pairs(pieces):
+    "Return the set of (a, b) of all ABA found in pieces."
+    pairs = set()
+    for piece in pieces:
+        # handle overlapping match
+        for i in re.findall(r"(?=(.)(.)\1)", piece):
+            # It is true only if the two group are there and are different
+            if i[0] != i[1]:
+                pairs.add(i)
+    return(pairs)
+
+
 def count_ssl(l):
     "Return number of SSL ip."
     count = 0
@@ -111,27 +124,195 @@ def count_ssl(l):
     for ip in l:
         supernet = re.findall(r"(.*?)(?:\[.*?\]|$)", ip)
         hypernet = re.findall(r"\[([^\]]+)\]", ip)
-        rf = False
-
-        for first in supernet:
-            # handle overlapping match
-            grf = re.findall(r"(?=(.)(.)\1)", first, flags=0)
-            # It is true only if the two group are there and are different
-            for i in grf:
-                if i[0] != i[1]:
 
-                    for second in hypernet:
-                        ssl = "".join([i[1], i[0], i[1]])
-                        grh = re.findall(ssl, second, flags=0)
-                        for k in grh:
-                            rf = True
+        # an ABA (a, b) in supernet needs a BAB in hypernet, i.e. an ABA
+        # (b, a) there
+        aba = aba_pairs(supernet)
+        bab = {(a, b) for b, a in aba_pairs(hypernet)}
 
         # It is an SSL only if ABA is in supernet part and BAB in hypernet
-        if rf:
+        if not aba.isdisjoint(bab):
             count += 1
     return(count)
 
 
-l = read_input()
-print("Day 7. Solution of part 1: {}".format(count_abba(l)))
-print("Day 7. Solution of part 2: {}".format(count_ssl(l)))
+def scan(chunks):
+    """Return the number of addresses supporting TLS and SSL in the bytes of
+    chunks (an iterable of bytes objects, split anywhere).
+
+    One pass state machine: for each byte it tracks whether we are inside
+    brackets and the last three bytes of the current piece of address, which
+    with the new byte make the sliding window where ABBA and ABA are looked
+    for. The ABA of the supernet and the BAB of the hypernet are kept as
+    (a, b) pairs, and a newline closes the address."""
+    tls = ssl = 0
+    depth = 0
+    # the last three bytes of the current piece
+    a = b = c = -1
+    # ABBA in the supernet and in the hypernet
+    abba = [False, False]
+    # (a, b) of ABA in the supernet and of BAB in the hypernet
+    aba = set()
+    bab = set()
+    empty = True
+    for chunk in chunks:
+        for x in chunk:
+            if x == newline:
+                if not empty:
+                    tls += abba[0] and not abba[1]
+                    ssl += not aba.isdisjoint(bab)
+                depth = 0
+                a = b = c = -1
+                abba = [False, False]
+                aba = set()
+                bab = set()
+                empty = True
+                continue
+            empty = False
+            if x == left:
+                depth += 1
+                a = b = c = -1
+            elif x == right:
+                depth -= 1
+                a = b = c = -1
+            else:
+                if a == x and b == c and a != b:
+                    abba[depth > 0] = True
+                if b == x and c != x:
+                    if depth:
+                        bab.add((c, x))
+                    else:
+                        aba.add((x, c))
+                a, b, c = b, c, x
+    # the last address may have no newline
+    if not empty:
+        tls += abba[0] and not abba[1]
+        ssl += not aba.isdisjoint(bab)
+    return(tls, ssl)
+
+
+def read_chunks(f, stop=None, size=1 << 20):
+    """Generate chunks of `size` bytes from the file object f, from its
+    current position up to the offset stop (or the end of file)."""
+    while True:
+        if stop is None:
+            chunk = f.read(size)
+        else:
+            chunk = f.read(max(min(size, stop - f.tell()), 0))
+        if not chunk:
+            return
+        yield chunk
+
+
+def split_file(fname, parts):
+    "Return the offsets splitting the file in about `parts` pieces of lines."
+    total = os.path.getsize(fname)
+    points = [0]
+    with open(fname, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(max(total * i // parts - 1, points[-1]))
+            # move to the start of the next line
+            f.readline()
+            points.append(f.tell())
+    points.append(total)
+    points = sorted(set(points))
+    return(list(zip(points, points[1:])))
+
+
+def scan_part(part):
+    "Scan the part (fname, start, stop) of a file."
+    fname, start, stop = part
+    with open(fname, 'rb') as f:
+        f.seek(start)
+        return(scan(read_chunks(f, stop)))
+
+
+def parallel_scan(fname='input', processes=None):
+    """Return the number of addresses supporting TLS and SSL scanning the
+    pieces of the file (split on newlines) on a pool of processes."""
+    parts = split_file(fname, 4 * (processes or os.cpu_count()))
+    with Pool(processes) as pool:
+        counts = pool.map(scan_part, [(fname, a, b) for a, b in parts])
+    return(sum(t for t, s in counts), sum(s for t, s in counts))
+
+
+def vector_scan(fname='input'):
+    """Return the number of addresses supporting TLS and SSL in the file,
+    with array operations on the whole file and no loop on the addresses."""
+    return(vector_count(np.fromfile(fname, dtype=np.uint8)))
+
+
+def vector_count(data):
+    """Return the number of addresses supporting TLS and SSL in data (the
+    addresses, one per line, as a uint8 array).
+
+    The depth inside brackets is the cumulative
+    sum of `[` (+1) and `]` (-1), minus its value at the start of each line.
+    ABBA and ABA are found comparing shifted views of the array: a window
+    made only by letters never crosses a bracket or a newline."""
+    if not len(data):
+        return(0, 0)
+    if data[-1] != newline:
+        data = np.append(data, np.uint8(newline))
+
+    # each line (address) with its newline
+    ends = np.flatnonzero(data == newline)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    line = np.repeat(np.arange(len(ends)), ends - starts + 1)
+
+    step = (data == left).astype(np.int64) - (data == right)
+    depth = np.cumsum(step)
+    depth -= (depth - step)[starts][line]
+    inside = depth > 0
+
+    a = data.astype(np.int64)
+    letter = (data >= ord('a')) & (data <= ord('z'))
+
+    # ABBA starting at each byte
+    abba = (letter[:-3] & letter[1:-2] & letter[2:-1] & letter[3:] &
+            (a[:-3] == a[3:]) & (a[1:-2] == a[2:-1]) & (a[:-3] != a[1:-2]))
+    abba = np.concatenate((abba, np.zeros(3, dtype=bool)))
+    supernet = np.add.reduceat(abba & ~inside, starts) > 0
+    hypernet = np.add.reduceat(abba & inside, starts) > 0
+    tls = int(np.count_nonzero(supernet & ~hypernet))
+
+    # ABA starting at each byte, as a key (line, a, b): a BAB in hypernet is
+    # the key (line, b, a) of the ABA it needs in supernet
+    aba = np.flatnonzero(letter[:-2] & letter[1:-1] & letter[2:] &
+                         (a[:-2] == a[2:]) & (a[:-2] != a[1:-1]))
+    key = line[aba] << 16
+    sup = ~inside[aba]
+    found = np.intersect1d(key[sup] | (a[aba][sup] << 8) | a[aba + 1][sup],
+                           key[~sup] | (a[aba + 1][~sup] << 8) | a[aba][~sup])
+    ssl = len(np.unique(found >> 16))
+    return(tls, ssl)
+
+# the examples of the puzzle: the first four for TLS, the others for SSL
+example = b"""abba[mnop]qrst
+abcd[bddb]xyyx
+aaaa[qwer]tyui
+ioxxoj[asdfgh]zxcvbn
+aba[bab]xyz
+xyx[xyx]xyx
+aaa[kek]eke
+zazbz[bzb]cdb"""
+
+if __name__ == "__main__":
+    # check the scanners with the examples
+    assert (count_abba(example.decode().split('\n')),
+            count_ssl(example.decode().split('\n'))) == (2, 3)
+    assert scan([example]) == (2, 3)
+    assert vector_count(np.frombuffer(b'', dtype=np.uint8)) == (0, 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        fname = os.path.join(tmp, 'example')
+        with open(fname, 'wb') as f:
+            f.write(example)
+        assert vector_scan(fname) == (2, 3)
+
+    # use all the cores only when the input is large enough to pay for them
+    if os.path.getsize('input') > parallel_size:
+        tls, ssl = parallel_scan()
+    else:
+        tls, ssl = scan_part(('input', 0, None))
+    print("Day 7. Solution of part 1: {}".format(tls))
+    print("Day 7. Solution of part 2: {}".format(ssl))
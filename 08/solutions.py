@@ -77,85 +77,190 @@ After you swipe your card, what code is the screen trying to display?
 
 """
 
-import re
+import io
+import os
 import numpy as np
 
+# operation codes of the parsed instructions
+RECT, ROW, COLUMN = range(3)
 
-def read_input():
-    """ This function read the instruction from the input file and
-    return a clean list of instruction."""
+# a parsed instruction: operation code and its two numbers
+instruction_dtype = np.dtype([('op', np.uint8), ('a', np.int32), ('b', np.int32)])
 
-    f = open('input', 'r')
-    string = f.read()
 
-    lstring = string.split("\n")
-    # we remove the last void instruction
-    # this could be made in a safer way
-    lstring = lstring[:-1]
+def parse_input(fname='input'):
+    """ This function parse at once all the instructions of the input file
+    and return them as a record array of (op, a, b), where op is one of RECT,
+    ROW, COLUMN and a, b are its two numbers."""
 
-    return(lstring)
+    raw = np.fromregex(fname, r"(rect|row|column)\D*(\d+)\D+(\d+)",
+                       [('op', 'U6'), ('a', np.int32), ('b', np.int32)])
+    instruction = np.empty(len(raw), dtype=instruction_dtype)
+    instruction['op'] = np.select([raw['op'] == 'rect', raw['op'] == 'row'],
+                                  [RECT, ROW], COLUMN)
+    instruction['a'] = raw['a']
+    instruction['b'] = raw['b']
+    return(instruction)
 
 
-def array_roll(a, index, by, axis):
-    "Roll array row/coll by specified amount by."
+def read_input(fname='input'):
+    """ This function return the parsed instructions of the input file. They
+    are cached in a .npy file next to it, parsed again only when the input
+    is newer than the cache."""
 
-    if axis:
-        # if move by columns axis = 1, transpose array
-        a = np.transpose(a)
+    cache = fname + '.npy'
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(fname):
+        return(np.load(cache))
+    instruction = parse_input(fname)
+    np.save(cache, instruction)
+    return(instruction)
 
-    # roll row of `by` position
-    a[index] = np.roll(a[index], by)
 
-    if axis:
-        # if move by columns axis = 1, transpose again array
-        a = np.transpose(a)
+class Display:
+    """The monitor, as a (nrow, ncol) array of 0 and 1. Rotations roll a
+    single row or a single column in place, so a row rotation touches ncol
+    pixels and a column rotation nrow pixels."""
 
-    return(a)
+    def __init__(self, nrow, ncol):
+        self.nrow = nrow
+        self.ncol = ncol
+        self.pixels = np.zeros((nrow, ncol), dtype=np.uint8)
 
+    def rect(self, dx, dy):
+        "Turn on the rectangle dx x dy at the top left."
+        self.pixels[:dy, :dx] = 1
 
-def process(monitor, instruction):
-    """Process the instructions on the monitor and return the final monitor state."""
+    def rotate_row(self, y, by):
+        "Roll row y right by `by` pixels."
+        self.pixels[y] = np.roll(self.pixels[y], by)
 
-    # create the opportune regex to capture instruction of operation
-    rect = re.compile(r"(\d+)x(\d+)")
-    rowr = re.compile(r"y=(\d+) by (\d+)")
-    colr = re.compile(r"x=(\d+) by (\d+)")
+    def rotate_column(self, x, by):
+        "Roll column x down by `by` pixels."
+        self.pixels[:, x] = np.roll(self.pixels[:, x], by)
 
-    for operation in instruction:
-        if operation.startswith("rect"):
-            # fill rect dx x dy with 1
-            dx, dy = re.findall(rect, operation)[0]
-            monitor[0:int(dy), 0:int(dx)] = 1
+    def apply(self, op, a, b):
+        "Apply a parsed instruction (op, a, b)."
+        if op == RECT:
+            # fill rect a x b with 1
+            self.rect(a, b)
 
-        elif operation.startswith("rotate column"):
-            # roll column `index` by `dy`
-            index, dy = re.findall(colr, operation)[0]
-            monitor = array_roll(monitor, int(index), int(dy), 1)
+        elif op == COLUMN:
+            # roll column `a` by `b`
+            self.rotate_column(a, b)
 
-        elif operation.startswith("rotate row"):
-            # roll row `index` by `dx`
-            index, dx = re.findall(rowr, operation)[0]
-            monitor = array_roll(monitor, int(index), int(dx), 0)
+        elif op == ROW:
+            # roll row `a` by `b`
+            self.rotate_row(a, b)
 
-    return(monitor)
+    def lit(self):
+        "Return the number of pixels on."
+        return(int(self.pixels.sum()))
+
+    def to_array(self):
+        "Return the monitor as a (nrow, ncol) array of 0 and 1."
+        return(self.pixels.astype(int))
+
+
+def process(monitor, instruction):
+    """Process the parsed instructions on the monitor (a Display) and return
+    it."""
+
+    for op, a, b in instruction.tolist():
+        monitor.apply(op, a, b)
 
+    return(monitor)
 
-def to_shape(monitor, nrow, ncol, by, voidc, fillc):
-    "Create shape letters from array"
-    # add 0 filled column to space letters
-    for c in range(ncol - by, 0, -by):
-        monitor = np.insert(monitor, c, 0, axis=1)
-        # replace 0 by `voidc` and 1 by `fillc`
-        # to iter tranform in a list and then agai in ndarray
-    monitor = [fillc if i else voidc for i in np.nditer(monitor, op_flags=['readwrite'])]
-    monitor = np.array(monitor).reshape(nrow, len(monitor) // nrow)
 
-    # create a string from array
-    string = "\n\n\t"
-    for row in monitor:
-        string += ''.join(row)
-        string += "\n\t"
-    return(string)
+def pack_rows(pixels):
+    """Pack each row of an array of 0 and 1 in bytes: bit x of byte n is the
+    pixel in column 8n + x."""
+    return(np.packbits(pixels, axis=1, bitorder='little'))
+
+
+class Timeline:
+    """The states of the monitor along the instructions, to answer queries
+    on the state after any step without replaying from the start.
+
+    Every `every` instructions the bit-packed rows are stored as a snapshot,
+    together with the OR of all the states of the following block of
+    instructions (the pixels that are on at some step of the block). A query
+    restores the nearest snapshot and replays at most `every` instructions."""
+
+    def __init__(self, nrow, ncol, instruction, every=1000):
+        self.nrow = nrow
+        self.ncol = ncol
+        self.every = every
+        self.instruction = instruction.tolist()
+        self.snapshots = []
+        self.seen = []
+        monitor = Display(nrow, ncol)
+        for start in range(0, len(self.instruction), every):
+            self.snapshots.append(pack_rows(monitor.pixels))
+            seen = np.zeros((nrow, ncol), dtype=np.uint8)
+            for op, a, b in self.instruction[start:start + every]:
+                monitor.apply(op, a, b)
+                # only the pixels changed by the instruction
+                if op == ROW:
+                    seen[a] |= monitor.pixels[a]
+                elif op == RECT:
+                    seen[:b, :a] = 1
+                else:
+                    seen[:, a] |= monitor.pixels[:, a]
+            self.seen.append(pack_rows(seen))
+
+    def restore(self, block):
+        "Return a Display in the state of the snapshot of block."
+        monitor = Display(self.nrow, self.ncol)
+        monitor.pixels = np.unpackbits(self.snapshots[block], axis=1,
+                                       count=self.ncol, bitorder='little')
+        return(monitor)
+
+    def state(self, k):
+        "Return the monitor (a Display) after the first k instructions."
+        k = min(k, len(self.instruction))
+        if not self.snapshots:
+            return(Display(self.nrow, self.ncol))
+        block = min(k // self.every, len(self.snapshots) - 1)
+        monitor = self.restore(block)
+        for op, a, b in self.instruction[block * self.every:k]:
+            monitor.apply(op, a, b)
+        return(monitor)
+
+    def first_on(self, r, c):
+        """Return the first step k (number of instructions applied) after
+        which the pixel in row r and column c is on, None if it never is."""
+        for block, seen in enumerate(self.seen):
+            if (seen[r, c // 8] >> (c % 8)) & 1:
+                monitor = self.restore(block)
+                start = block * self.every
+                for k, (op, a, b) in enumerate(self.instruction[start:start + self.every]):
+                    monitor.apply(op, a, b)
+                    if monitor.pixels[r, c]:
+                        return(start + k + 1)
+        return(None)
+
+
+def glyph_key(rows):
+    """Pack the rows of a glyph cell (each one an integer, bit x is the pixel
+    in column x) in a single integer."""
+    key = 0
+    for r in rows:
+        key = (key << nby) | r
+    return(key)
+
+
+def read_monitor(monitor):
+    """Return the letters shown on the monitor (a Display), reading each cell
+    of `nby` columns as the key of the glyph table. An unknown glyph is
+    read as `?`."""
+    # bit x of a row of the cell is the pixel in its column x
+    weight = 1 << np.arange(nby)
+    letters = []
+    for x in range(0, monitor.ncol, nby):
+        cell = monitor.pixels[:, x:x + nby]
+        key = glyph_key((cell @ weight[:cell.shape[1]]).tolist())
+        letters.append(glyph_table.get(key, '?'))
+    return(''.join(letters))
 
 # number of rows and columns in monitor
 nrow = 6
@@ -164,17 +269,54 @@ ncol = 50
 # number of columns in a letter block
 nby = 5
 
-# chars for void and fill in a letter block
-voidc = ' '
-fillc = '█'  # Unicode FULL BLOCK
-
-# create the monitor as array
-monitor = [0] * (nrow * ncol)
-monitor = np.array(monitor).reshape(nrow, ncol)
+# the letters of the monitor font, a row of each glyph cell after the other
+glyphs = {
+    'A': ".##.. #..#. #..#. ####. #..#. #..#.",
+    'B': "###.. #..#. ###.. #..#. #..#. ###..",
+    'C': ".##.. #..#. #.... #.... #..#. .##..",
+    'E': "####. #.... ###.. #.... #.... ####.",
+    'F': "####. #.... ###.. #.... #.... #....",
+    'G': ".##.. #..#. #.... #.##. #..#. .###.",
+    'H': "#..#. #..#. ####. #..#. #..#. #..#.",
+    'I': ".###. ..#.. ..#.. ..#.. ..#.. .###.",
+    'J': "..##. ...#. ...#. ...#. #..#. .##..",
+    'K': "#..#. #.#.. ##... #.#.. #.#.. #..#.",
+    'L': "#.... #.... #.... #.... #.... ####.",
+    'O': ".##.. #..#. #..#. #..#. #..#. .##..",
+    'P': "###.. #..#. #..#. ###.. #.... #....",
+    'R': "###.. #..#. #..#. ###.. #.#.. #..#.",
+    'S': ".###. #.... #.... .##.. ...#. ###..",
+    'U': "#..#. #..#. #..#. #..#. #..#. .##..",
+    'Y': "#...# #...# .#.#. ..#.. ..#.. ..#..",
+    'Z': "####. ...#. ..#.. .#... #.... ####.",
+}
+
+# glyph key -> letter
+glyph_table = {glyph_key(sum(1 << x for x, c in enumerate(row) if c == '#')
+                         for row in glyph.split()): letter
+               for letter, glyph in glyphs.items()}
+
+# check the timeline with the example of the puzzle (a 7x3 monitor): the
+# pixel at the top right is on from the third instruction
+example = parse_input(io.StringIO("rect 3x2\n"
+                                  "rotate column x=1 by 1\n"
+                                  "rotate row y=0 by 4\n"
+                                  "rotate column x=1 by 1\n"))
+timeline = Timeline(3, 7, example, every=2)
+assert timeline.state(4).lit() == 6
+assert timeline.first_on(0, 6) == 3
+assert timeline.first_on(2, 0) is None
+
+# create the monitor
+monitor = Display(nrow, ncol)
 
 # process instructions
-monitor = process(monitor, read_input())
+instruction = read_input()
+monitor = process(monitor, instruction)
+
+# the timeline of the instructions ends in the same state
+assert np.array_equal(Timeline(nrow, ncol, instruction).state(len(instruction)).pixels,
+                      monitor.pixels)
 
-print("Day 8. Solution of part 1: {}".format(sum(sum(monitor))))
-print("Day 8. Solution of part 2: {}".format(to_shape(monitor, nrow, ncol,
-                                                      5, voidc, fillc)))
+print("Day 8. Solution of part 1: {}".format(monitor.lit()))
+print("Day 8. Solution of part 2: {}".format(read_monitor(monitor)))
@@ -77,108 +77,191 @@ What is the decompressed length of the file using this improved format?
 
 """
 
+import mmap
 
-def read_input():
-    """ This function read the compressed string from the input file and
-    return a clean string without space."""
+# the whitespaces are ignored by the format
+whitespace = b' \t\r\n'
 
-    f = open('input', 'r')
-    string = f.read()
-    string = string.replace("\n", "").replace(" ", "")
-    return(string)
 
+def read_buffer(fname='input'):
+    """Return the compressed file as a read only memory map (it works like
+    bytes, without reading the whole file in memory)."""
 
-def count_decompress(strarg):
-    """Count size of decompressed strarg."""
+    with open(fname, 'rb') as f:
+        return(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
 
-    index = 0
-    count = 0
-    while index < len(strarg):
-        # find the first occurence of `(` `)` and `x` within the two
-        start = strarg[index:].find('(')
-        end = strarg[index:].find(')')
-        timesp = strarg[index:].find('x')
 
-        # grab the two int of the form (NxM)
-        if (start >= 0) & (end >= 0) & (timesp >= 0):
-            N = int(strarg[index + start + 1:index + timesp])
-            M = int(strarg[index + timesp + 1:index + end])
+def data_end(buf):
+    "Return the end of the data in buf, without the trailing whitespaces."
+    end = len(buf)
+    while end and buf[end - 1:end].isspace():
+        end -= 1
+    return(end)
 
-            # add the len of string before marker
-            count += len(strarg[index:index + start])
 
-            # add the decompressed len
-            count += len(strarg[index + end + 1:index + N + end + 1] * M)
+def squeeze(buf):
+    """Return buf without its whitespaces. When they are all at its end buf
+    is returned as it is, without a copy (data_end() stops before them)."""
 
-            # move index at the end of mark
-            index = index + end + N + 1
-        else:
-            count += len(strarg[index:])
-            index = len(strarg)
-    return(count)
+    end = data_end(buf)
+    if all(buf.find(bytes([c]), 0, end) < 0 for c in whitespace):
+        return(buf)
+    return(bytes(buf).translate(None, whitespace))
 
 
-def count_decompress2(strarg):
-    """Count size of decompressed strarg."""
+def parse_marker(buf, start, limit):
+    """Parse the marker (NxM) starting at offset start of buf. Return N, M
+    and the offset after the marker, or None if there is no complete marker
+    before limit."""
 
-    index = 0
-    count = 0
-    while index < len(strarg):
-        # find the first occurence of `(` `)` and `x` within the two
-        start = strarg[index:].find('(')
-        end = strarg[index:].find(')')
-        timesp = strarg[index:].find('x')
+    end = buf.find(b')', start, limit)
+    if end < 0:
+        return(None)
+    N, M = buf[start + 1:end].split(b'x')
+    return(int(N), int(M), end + 1)
 
-        # grab the two int of the form (NxM)
-        if (start >= 0) & (end >= 0) & (timesp >= 0):
-            N = int(strarg[index + start + 1:index + timesp])
-            M = int(strarg[index + timesp + 1:index + end])
 
-            # add the len of string before marker
-            count += len(strarg[index:index + start])
+def decompressed_length(buf, version=2):
+    """Return the decompressed length of buf (bytes, or a memory map) for
+    the format version 1 or 2.
 
-            # add the decompressed len
-            count += count_decompress2(strarg[index + end + 1:index + N + end + 1]) * M
+    It works on integer offsets, without copying buf unless it has
+    whitespaces before its end (see squeeze()), and the nested
+    markers of version 2 are an explicit stack of frames (end, multiplier)
+    instead of recursion: each byte counts as many times as the product of
+    the repetitions of the markers it is in."""
 
-            # move index at the end of mark
-            index = index + end + N + 1
+    buf = squeeze(buf)
+    end = data_end(buf)
+    count = 0
+    index = 0
+    # the frames of the markers we are in, and their multiplier
+    frames = []
+    multiplier = 1
+    while index < end:
+        # leave the frames that end here
+        while frames and frames[-1][0] <= index:
+            frames.pop()
+            multiplier = frames[-1][1] if frames else 1
+        limit = frames[-1][0] if frames else end
+
+        # add the len of string before marker
+        start = buf.find(b'(', index, limit)
+        if start < 0:
+            count += (limit - index) * multiplier
+            index = limit
+            continue
+        count += (start - index) * multiplier
+
+        marker = parse_marker(buf, start, limit)
+        if marker is None:
+            count += (limit - start) * multiplier
+            index = limit
+            continue
+        N, M, index = marker
+
+        if version == 1:
+            # the data of the marker is not decompressed again
+            count += min(N, limit - index) * M
+            index += N
         else:
-            count += len(strarg[index:])
-            index = len(strarg)
+            # the data of the marker is repeated M times
+            multiplier *= M
+            frames.append((min(index + N, limit), multiplier))
+    return(count)
+
+
+def decompress_chunks(buf, version=2, size=1 << 16):
+    """Generate the decompressed buf (bytes, or a memory map) for the format
+    version 1 or 2, in chunks of about `size` bytes.
+
+    Nothing is expanded in memory: the markers we are in are a stack of
+    frames [start, end, index, repeats left, literal] and the output is
+    produced walking them, so the memory is proportional to the nesting
+    depth and to the size of a chunk. In version 1 the data of a marker is
+    a literal frame (its markers are not decompressed)."""
+
+    buf = squeeze(buf)
+    out = bytearray()
+    frames = [[0, data_end(buf), 0, 1, False]]
+    while frames:
+        frame = frames[-1]
+        start, end, index, left, literal = frame
+
+        if index >= end:
+            # repeat the frame, or leave it
+            frame[3] -= 1
+            if frame[3]:
+                frame[2] = start
+            else:
+                frames.pop()
+            continue
+
+        if index == start and end - start <= size and (
+                literal or buf.find(b'(', start, end) < 0):
+            # a frame without markers: emit as many repetitions as fit in
+            # the chunk at once
+            times = min(left, max(1, (size - len(out)) // (end - start)))
+            out += buf[start:end] * times
+            frame[2] = end
+            frame[3] -= times - 1
+            if len(out) >= size:
+                yield bytes(out)
+                out.clear()
+            continue
+
+        # the string before the next marker
+        marker = None
+        stop = end
+        if not literal:
+            found = buf.find(b'(', index, end)
+            if found >= 0:
+                marker = parse_marker(buf, found, end)
+                if marker is not None:
+                    stop = found
+        stop = min(stop, index + size - len(out))
+        out += buf[index:stop]
+        frame[2] = stop
+        if len(out) >= size:
+            yield bytes(out)
+            out.clear()
+
+        if marker is not None and stop == found:
+            # enter the data of the marker
+            N, M, index = marker
+            frame[2] = min(index + N, end)
+            frames.append([index, frame[2], index, M, version == 1])
+
+    if out:
+        yield bytes(out)
+
+
+def decompress_to(buf, write, version=2, size=1 << 16):
+    """Decompress buf writing it in chunks with write (e.g. the write of a
+    file, or the sendall of a socket). Return the decompressed length."""
+
+    count = 0
+    for chunk in decompress_chunks(buf, version, size):
+        write(chunk)
+        count += len(chunk)
     return(count)
 
 
 #  Test function for debug purpose
 def decompress(strarg):
     """Decompress strarg."""
+    return(b''.join(decompress_chunks(strarg.encode(), 1)).decode())
 
-    index = 0
-    result_string = ""
-    while index < len(strarg):
-        # find the first occurence of `(` `)` and `x` within the two
-        start = strarg[index:].find('(')
-        end = strarg[index:].find(')')
-        timesp = strarg[index:].find('x')
-
-        # grab the two int of the form (NxM)
-        if (start >= 0) & (end >= 0) & (timesp >= 0):
-            N = int(strarg[index + start + 1:index + timesp])
-            M = int(strarg[index + timesp + 1:index + end])
-
-            # add the string before marker to result_string
-            result_string += strarg[index:index + start]
-
-            # add decompressed strarg
-            result_string += strarg[index + end + 1:index + N + end + 1] * M
-
-            # move index at the end of mark
-            index = index + end + N + 1
-        else:
-            result_string += strarg[index:]
-            index = len(strarg)
-    return(result_string)
+# check with the examples of the puzzle, the whitespaces are ignored
+assert decompress("A(2x2)BCD(2x2)EFG") == "ABCBCDEFEFG"
+assert decompress("X(8x2)(3x3)ABCY") == "X(3x3)ABC(3x3)ABCY"
+assert decompressed_length(b"X(8x2)(3x3)ABCY") == 20
+assert decompressed_length(b"(27x12)(20x12)(13x14)(7x10)(1x12)A") == 241920
+assert decompressed_length(b"(25x3)(3x3)ABC(2x3)XY(5x2)PQRSTX(18x9)(3x2)TWO(5x7)SEVEN") == 445
+assert decompressed_length(b"A B\nC", 2) == 3
+assert decompressed_length(b"(3x2)A B\nCDE\n", 1) == 8
 
-string = read_input()
+buf = read_buffer()
 
-print("Day 9. Solution of part 1: {}".format(count_decompress(string)))
-print("Day 9. Solution of part 2: {}".format(count_decompress2(string)))
+print("Day 9. Solution of part 1: {}".format(decompressed_length(buf, 1)))
+print("Day 9. Solution of part 2: {}".format(decompressed_length(buf, 2)))
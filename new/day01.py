@@ -49,6 +49,7 @@ How many blocks away is the first location you visit twice?
 
 """
 
+from random import random
 from sys import stdin
 
 # complex variable containing the point where you are
@@ -64,91 +65,235 @@ walk = 0
 # calculating it, it is None
 firstcross = None
 
-# To solve the second part of this puzzle we need to store locations. We
-# choose to store them as list of points in the complex plane.
-points = []
-
-
-def read_input():  # fname):
-    """ This function read the instruction from the input file and
-    return a clean list of instruction. Each elements of the returned
-    list is of the form Dn, where D is one of L,R (turn left right) and
-    n is the number of block to walk."""
-
-    # we need to remove space and carriage return to clean the input list
-    instructions = stdin.read().strip().replace(' ', '').split(",")
-    return(instructions)
-
-
-# The following two function resolve a general problem on the intersection
-# of two segments.
-# The actual problem is simpler and this approach may be too general.
-# Anyway it doesn't cost too much in terms of computation and we
-# can accept this solution.
-#
-# More info on this algorithm on
-# http://bryceboe.com/2006/10/23/line-segment-intersection-algorithm/
-def ccw(A, B, C):
-    """With three points A, B and C. If the slope of
-    the line AB is less than the slope of the line AC then the three points are
-    listed in a counter-clockwise order."""
-
-    return (C.imag - A.imag) * (B.real - A.real) > (B.imag - A.imag) * (C.real - A.real)
-
-
-def intersect(A, B, C, D):
-    """ Return true if line segments AB and CD intersect """
-    #
-    #   (1)                  (2)
-    #
-    #    D                    D
-    #    |                    |
-    # A--+--B    or   A-----B |
-    #    |                    |
-    #    C                    C
-    #
-    # In the first case (the two segments intersect) the two couple of
-    # three-points ([ACD,BCD] and [ABC,ABD]) have not the same sign of
-    # orientation, one is ccw the other is not. In the second case (the two
-    # segments doesn't have intersection), the couple of three points has the
-    # same sign of orientation. Notice that all the possible cases can be
-    # obtained for simmetry by exchanging the segment vertex.
-    return ccw(A, C, D) != ccw(B, C, D) and ccw(A, B, C) != ccw(A, B, D)
-
-
-def iscrossing(A, B, points):
-    """This function returns the point of intersection of the segment ab with
-    previous segments of the walk (vertex of walk are in the list points).
-    It returns None if there were non intersection."""
-
-    # if there are not enough points it is impossible that we can have an
-    # intersection (even if returning back on our own step could be interpreted
-    # as an intersection, but we can turn only R or L so we need at least 3
-    # turns to intersect our own walk).
-    if (len(points) < 3):
-        return(None)
-
-    # for each segment of our walk we check for an intersection
-    # This seems very intensive as computation, but we can trust
-    # the puzzle introduction, that says that the intersection happens
-    # early in our walk.
-    segments = [(points[i], points[i + 1]) for i in range(len(points) - 2)]
-    for C, D in segments:
-        if intersect(A, B, C, D):
-
-            # (not (xa - xb) * xa)  is  xa if xa == xb
-            cross = ((not (A.real - B.real)) * A.real +
-                     (not (A.imag - B.imag)) * A.imag +
-                     (not (C.real - D.real)) * C.real +
-                     (not (C.imag - D.imag)) * C.imag)
-
-            return (cross)
-
-    return(None)
-
-# we read all instruction and place them in a list
+
+def read_input(size=1 << 16):
+    """ This function read the instruction from the standard input and
+    generate them one at a time. Each generated instruction is of the form
+    Dn, where D is one of L,R (turn left right) and n is the number of block
+    to walk.
+
+    The input is read in chunks of `size` chars, so the whole stream never
+    needs to fit in memory: only the (partial) token at the end of a chunk is
+    carried over to the next one."""
+
+    rest = ''
+    while True:
+        chunk = stdin.read(size)
+        if not chunk:
+            break
+        # all tokens but the last one are complete
+        tokens = (rest + chunk).split(",")
+        rest = tokens.pop()
+        for token in tokens:
+            # we need to remove space and carriage return to clean the token
+            token = token.strip()
+            if token:
+                yield token
+
+    rest = rest.strip()
+    if rest:
+        yield rest
+
+
+class Treap:
+    """Balanced search tree mapping each key to the list of its values, with
+    range queries. It is a treap: a binary search tree on the keys and a
+    heap on random priorities, so its expected depth is O(log n)."""
+
+    def __init__(self):
+        # a node is [key, priority, left, right, values]
+        self.root = None
+
+    def insert(self, key, value):
+        "Add value to the values of key."
+        self.root = self._insert(self.root, key, value)
+
+    def _insert(self, node, key, value):
+        if node is None:
+            return([key, random(), None, None, [value]])
+        if key == node[0]:
+            node[4].append(value)
+        elif key < node[0]:
+            node[2] = self._insert(node[2], key, value)
+            if node[2][1] > node[1]:
+                # rotate right
+                left = node[2]
+                node[2] = left[3]
+                left[3] = node
+                return(left)
+        else:
+            node[3] = self._insert(node[3], key, value)
+            if node[3][1] > node[1]:
+                # rotate left
+                right = node[3]
+                node[3] = right[2]
+                right[2] = node
+                return(right)
+        return(node)
+
+    def range(self, low, high):
+        """Generate (key, values) for low <= key <= high, in key order, in
+        O(log n + k)."""
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                if node[0] < low:
+                    # all the left subtree is before low
+                    node = node[3]
+                else:
+                    stack.append(node)
+                    node = node[2]
+            else:
+                node = stack.pop()
+                if node[0] > high:
+                    return
+                yield (node[0], node[4])
+                node = node[3]
+
+
+class StabIndex:
+    """Intervals of integers in the canonical nodes of an implicit segment
+    tree over all the integers: the node (level, n) covers the integers from
+    n << level to (n + 1) << level (excluded). An interval is split in O(log)
+    disjoint nodes, and the nodes containing a point are one for each level,
+    so every interval in them contains the point."""
+
+    def __init__(self, bucket):
+        # bucket creates what a node keeps
+        self.bucket = bucket
+        self.nodes = {}
+        self.levels = 0
+
+    def _node(self, level, n):
+        "Return the bucket of the node (level, n), creating it if needed."
+        if (level, n) not in self.nodes:
+            self.nodes[level, n] = self.bucket()
+        return(self.nodes[level, n])
+
+    def insert(self, low, high):
+        "Return the buckets of the nodes covering the interval [low, high]."
+        buckets = []
+        level = 0
+        high += 1
+        while low < high:
+            if low & 1:
+                buckets.append(self._node(level, low))
+                low += 1
+            if high & 1:
+                high -= 1
+                buckets.append(self._node(level, high))
+            low >>= 1
+            high >>= 1
+            level += 1
+        self.levels = max(self.levels, level)
+        return(buckets)
+
+    def stab(self, point):
+        "Generate the buckets of the nodes containing point."
+        for level in range(self.levels):
+            bucket = self.nodes.get((level, point >> level))
+            if bucket is not None:
+                yield bucket
+
+
+class SegmentIndex:
+    """Index of the segments of a walk, to find crossings without rescanning
+    every previous segment.
+
+    The horizontal segments are kept in a StabIndex on their x interval, and
+    each of its nodes keeps the y of its segments in a Treap: a vertical leg
+    at x from y1 to y2 stabs the nodes containing x (one per level) and
+    reads from each one only the y between y1 and y2, i.e. only segments
+    that cross it. The vertical segments are kept the same way, swapping x
+    and y. For the segments on the same line of a leg, each line has a
+    StabIndex of its segments (the ones containing the start of the leg) and
+    a Treap of their starts (the ones starting inside the leg). Each query
+    costs O(log^2 n) plus the number of segments found."""
+
+    def __init__(self):
+        self.horizontal = StabIndex(Treap)
+        self.vertical = StabIndex(Treap)
+        # fixed coordinate -> (StabIndex of the segments, Treap of the starts)
+        self.hlines = {}
+        self.vlines = {}
+
+    def _leg(self, A, B):
+        """Return the indexes of the family of the leg AB (its own and the
+        perpendicular one), its fixed coordinate and the coordinates of A and
+        B along it."""
+        if A.real == B.real:
+            return(self.vertical, self.vlines, self.horizontal,
+                   int(A.real), int(A.imag), int(B.imag))
+        return(self.horizontal, self.hlines, self.vertical,
+               int(A.imag), int(A.real), int(B.real))
+
+    def add(self, A, B):
+        "Add the leg AB of the walk to the index."
+        if A == B:
+            # a zero length leg visits nothing new
+            return
+        family, lines, other, fixed, start, stop = self._leg(A, B)
+        low, high = min(start, stop), max(start, stop)
+        for bucket in family.insert(low, high):
+            bucket.insert(fixed, None)
+        if fixed not in lines:
+            lines[fixed] = (StabIndex(list), Treap())
+        segments, starts = lines[fixed]
+        for bucket in segments.insert(low, high):
+            bucket.append((low, high))
+        starts.insert(low, high)
+
+    def _hits(self, A, B):
+        """Generate the stretches of the leg AB lying on indexed segments,
+        as (near, far) distances from A. A perpendicular crossing is a
+        stretch with near == far."""
+        family, lines, other, fixed, start, stop = self._leg(A, B)
+        low, high = min(start, stop), max(start, stop)
+
+        # perpendicular segments: the ones containing our fixed coordinate,
+        # with their own fixed coordinate between low and high
+        for bucket in other.stab(fixed):
+            for key, values in bucket.range(low, high):
+                d = abs(key - start)
+                yield (d, d)
+
+        # parallel segments on our own line: we walk again on part of them
+        if fixed in lines:
+            segments, starts = lines[fixed]
+            # the ones containing low, then the ones starting after it
+            found = [s for bucket in segments.stab(low) for s in bucket]
+            for l, highs in starts.range(low + 1, high):
+                found.extend((l, h) for h in highs)
+            for l, h in found:
+                d1 = abs(max(l, low) - start)
+                d2 = abs(min(h, high) - start)
+                yield (min(d1, d2), max(d1, d2))
+
+    def crossing(self, A, B):
+        """Return the first point of the leg AB (A excluded) already visited
+        by the walk, or None."""
+        if A == B:
+            return(None)
+        first = None
+        for near, far in self._hits(A, B):
+            if far >= 1:
+                d = max(near, 1)
+                if first is None or d < first:
+                    first = d
+        if first is None:
+            return(None)
+        return(A + (B - A) / abs(B - A) * first)
+
+
+# we read the instructions as they arrive on the standard input
 instruction = read_input()
 
+# To solve the second part of this puzzle we need to store locations. We
+# choose to store the segments of the walk in a SegmentIndex, so that each new
+# leg is checked only against the segments it can cross.
+segments = SegmentIndex()
+
 # left is a ccw turn, i.e. a multiplication by -j
 # right is a cw turn, i.e. a multiplication by j
 turn = {'L': -1j, 'R': 1j}
@@ -168,12 +313,18 @@ for i in instruction:
     # if we have already calculated the first intersection we don't need
     # to calculate the new ones.
     if firstcross is None:
-        firstcross = iscrossing(oldpoint, walk, points)
-
-    # anyway we store in the points list the new vertex of our walk
-    points.append(walk)
+        firstcross = segments.crossing(oldpoint, walk)
+
+        if firstcross is None:
+            # the new leg is indexed only while we are still looking for
+            # the first crossing
+            segments.add(oldpoint, walk)
+        else:
+            # the value of firstcross is the first points of intersection, we
+            # can report it right now and free the index: from here on the
+            # walk needs constant memory
+            print("Day 1. Solution of part 2: {}".format(int(abs(firstcross.real) + abs(firstcross.imag))))
+            segments = None
 
 # the last walk point contains the Manhattan distance from our starting point
 print("Day 1. Solution of part 1: {}".format(int(abs(walk.real) + abs(walk.imag))))
-# the value of firstcross is the first points of intersection
-print("Day 1. Solution of part 2: {}".format(int(abs(firstcross.real) + abs(firstcross.imag))))